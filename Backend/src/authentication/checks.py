@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+LOCAL_CACHE_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register(Tags.caches, Tags.database)
+def check_replica_cache(app_configs, **kwargs):
+    """Read-your-writes pins are lost between workers unless the cache is shared"""
+    if settings.AUTH_DB_REPLICAS and settings.CACHES['default']['BACKEND'] in LOCAL_CACHE_BACKENDS:
+        return [Error(
+            "DB_REPLICAS needs a cache shared by all workers for read-your-writes.",
+            hint="Set REDIS_URL. For a single-process local run, add 'authentication.E001' "
+                 "to SILENCED_SYSTEM_CHECKS.",
+            id='authentication.E001',
+        )]
+    return []
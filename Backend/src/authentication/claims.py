@@ -0,0 +1,76 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+NO_ROLE = 'No Role'
+
+
+def role_codes():
+    return getattr(settings, 'JWT_ROLE_CODES', {})
+
+
+def role_names_by_code():
+    return {code: name for name, code in role_codes().items()}
+
+
+def user_roles(user):
+    """Group names of the user in a single query"""
+    return list(user.groups.values_list('name', flat=True)) or [NO_ROLE]
+
+
+def add_token_claims(token, user, roles, profile=None):
+    """
+    Add the claims of the given profile (JWT_CLAIMS_PROFILE by default) to a token.
+
+    full:    email, names and role names, as the frontend always received them.
+    minimal: only `rl`, the role codes from JWT_ROLE_CODES. Display fields are
+             served by MeClaimsView instead of riding on every request. Roles
+             without a code are left out (and logged) rather than downgraded.
+    """
+    profile = profile or getattr(settings, 'JWT_CLAIMS_PROFILE', 'full')
+    if profile == 'minimal':
+        codes = role_codes()
+        unknown = [role for role in roles if role not in codes]
+        if unknown:
+            logger.warning("Roles %s of user %s have no JWT_ROLE_CODES entry, left out of the token", unknown, user.pk)
+        token['rl'] = [codes[role] for role in roles if role in codes]
+    elif profile == 'full':
+        token['email'] = user.email
+        token['first_name'] = user.first_name
+        token['last_name'] = user.last_name
+        token['full_name'] = user.first_name + (user.last_name or '')
+        token['role'] = roles
+    else:
+        raise ValueError(f"Unknown JWT claims profile: {profile}")
+    return token
+
+
+def me_claims_cache_key(user_id):
+    return f"auth:me-claims:{user_id}"
+
+
+def get_display_claims(user):
+    """Display fields left out of minimal tokens, cached per user"""
+    key = me_claims_cache_key(user.pk)
+    claims = cache.get(key)
+    if claims is None:
+        claims = {
+            'email': user.email,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'full_name': user.first_name + (user.last_name or ''),
+            'role': user_roles(user),
+        }
+        cache.set(key, claims, getattr(settings, 'ME_CLAIMS_CACHE_TIMEOUT', 300))
+    return claims
+
+
+def invalidate_display_claims(user):
+    cache.delete(me_claims_cache_key(user.pk))
+
+
+def invalidate_display_claims_for(user_ids):
+    cache.delete_many([me_claims_cache_key(user_id) for user_id in user_ids])
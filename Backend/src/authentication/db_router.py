@@ -0,0 +1,104 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# True while the current request must read from the primary (read-your-writes)
+_use_primary = ContextVar('auth_use_primary', default=False)
+
+
+def _pin_key(user_id):
+    return f"auth:db-pin:{user_id}"
+
+
+def _email_pin_key(email):
+    return f"auth:db-pin:email:{email.strip().lower()}"
+
+
+def pin_user_to_primary(user_id, email=None):
+    """Route this request's reads, and the user's reads for AUTH_DB_STICKY_SECONDS, to the primary"""
+    _use_primary.set(True)
+    if not settings.AUTH_DB_REPLICAS:
+        return
+    pins = {}
+    if user_id is not None:
+        pins[_pin_key(user_id)] = True
+    if email:
+        # Login and password reset are anonymous, they only know the email
+        pins[_email_pin_key(email)] = True
+    if pins:
+        cache.set_many(pins, settings.AUTH_DB_STICKY_SECONDS)
+
+
+def pin_users_to_primary(user_ids):
+    """pin_user_to_primary for writes that touch users only by id, e.g. group.user_set.add()"""
+    _use_primary.set(True)
+    if settings.AUTH_DB_REPLICAS and user_ids:
+        cache.set_many({_pin_key(user_id): True for user_id in user_ids}, settings.AUTH_DB_STICKY_SECONDS)
+
+
+def restore_user_pin(user_id):
+    """Called once the request's user is known, keeps them on the primary after a recent write"""
+    if settings.AUTH_DB_REPLICAS and cache.get(_pin_key(user_id)):
+        _use_primary.set(True)
+
+
+def restore_email_pin(email):
+    """Same as restore_user_pin for anonymous requests, called before the user is looked up by email"""
+    if settings.AUTH_DB_REPLICAS and email and cache.get(_email_pin_key(email)):
+        _use_primary.set(True)
+
+
+class AuthReplicaRouter:
+    """
+    Send reads of the authentication app (and the auth groups used for roles) to one
+    of AUTH_DB_REPLICAS and all writes to the default database.
+
+    A write to a user pins that user (by id and by email) to the primary for
+    AUTH_DB_STICKY_SECONDS so the next requests, including an anonymous login,
+    read their own write even if the replicas lag behind. The pin is kept in the
+    cache, which must be shared between processes (see CACHES and checks.py).
+    Without replicas no pins are read or written.
+    """
+    route_app_labels = {'authentication', 'auth'}
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in self.route_app_labels:
+            return None
+        replicas = settings.AUTH_DB_REPLICAS
+        if not replicas or _use_primary.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in self.route_app_labels:
+            return None
+        instance = hints.get('instance')
+        if isinstance(instance, get_user_model()):
+            pin_user_to_primary(instance.pk, instance.email)
+        else:
+            pin_user_to_primary(None)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.AUTH_DB_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class PrimaryPinMiddleware:
+    """Start every request unpinned, the context may be reused by the next request on this thread"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _use_primary.set(False)
+        try:
+            return self.get_response(request)
+        finally:
+            _use_primary.reset(token)
@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+from .metrics import hasher_timings
+
+
+class TunableHasherMixin:
+    """
+    Reads work factors from settings.PASSWORD_HASHER_PARAMS[profile] instead of
+    class attributes, and records encode/verify timings per algorithm.
+
+    Explicit params can be passed to the constructor (used by calibrate_hasher).
+    """
+    profile = None
+
+    def __init__(self, params=None):
+        self._params = params
+
+    @property
+    def tuning(self):
+        if self._params is not None:
+            return self._params
+        return getattr(settings, 'PASSWORD_HASHER_PARAMS', {}).get(self.profile, {})
+
+    def encode(self, password, salt, *args, **kwargs):
+        with hasher_timings.measure(self.algorithm, 'encode'):
+            return super().encode(password, salt, *args, **kwargs)
+
+    def verify(self, password, encoded):
+        with hasher_timings.measure(self.algorithm, 'verify'):
+            return super().verify(password, encoded)
+
+
+class PBKDF2PasswordHasher(TunableHasherMixin, hashers.PBKDF2PasswordHasher):
+    profile = 'pbkdf2'
+
+    @property
+    def iterations(self):
+        return int(self.tuning.get('iterations', super().iterations))
+
+
+class ScryptPasswordHasher(TunableHasherMixin, hashers.ScryptPasswordHasher):
+    profile = 'scrypt'
+
+    @property
+    def work_factor(self):
+        return int(self.tuning.get('work_factor', super().work_factor))
+
+    @property
+    def block_size(self):
+        return int(self.tuning.get('block_size', super().block_size))
+
+    @property
+    def parallelism(self):
+        return int(self.tuning.get('parallelism', super().parallelism))
+
+    @property
+    def maxmem(self):
+        return int(self.tuning.get('maxmem', super().maxmem))
+
+
+class Argon2PasswordHasher(TunableHasherMixin, hashers.Argon2PasswordHasher):
+    profile = 'argon2'
+
+    @property
+    def time_cost(self):
+        return int(self.tuning.get('time_cost', super().time_cost))
+
+    @property
+    def memory_cost(self):
+        return int(self.tuning.get('memory_cost', super().memory_cost))
+
+    @property
+    def parallelism(self):
+        return int(self.tuning.get('parallelism', super().parallelism))
+
+
+HASHER_PROFILES = {
+    PBKDF2PasswordHasher.profile: PBKDF2PasswordHasher,
+    ScryptPasswordHasher.profile: ScryptPasswordHasher,
+    Argon2PasswordHasher.profile: Argon2PasswordHasher,
+}
@@ -0,0 +1,14 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from .db_router import restore_user_pin
+
+
+class StickyJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that reads users who just wrote from the primary database"""
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is not None:
+            restore_user_pin(user_id)
+        return super().get_user(validated_token)
@@ -0,0 +1,48 @@
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentication.claims import add_token_claims
+
+User = get_user_model()
+
+PROFILES = ['full', 'minimal']
+
+
+class Command(BaseCommand):
+    help = "Compare access token size and encode/decode time for each JWT claims profile"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=1000)
+        parser.add_argument('--roles', nargs='+', default=['student'],
+                            help="Role names to put in the sample tokens")
+
+    def handle(self, *args, **options):
+        iterations = max(1, options['iterations'])
+        # An unsaved user is enough to build claims, the benchmark never touches the DB
+        user = User(id=1, email='benchmark.user@example.com', first_name='Benchmark', last_name='User')
+
+        self.stdout.write(f"{'profile':<10}{'bytes':>8}{'encode us':>12}{'decode us':>12}")
+        for profile in PROFILES:
+            size, encode_us, decode_us = self.benchmark(user, options['roles'], profile, iterations)
+            self.stdout.write(f"{profile:<10}{size:>8}{encode_us:>12.1f}{decode_us:>12.1f}")
+        self.stdout.write(f"Active profile: {settings.JWT_CLAIMS_PROFILE}")
+
+    def benchmark(self, user, roles, profile, iterations):
+        # AccessToken.for_user, unlike RefreshToken.for_user, does not record an outstanding token
+        access = add_token_claims(AccessToken.for_user(user), user, roles, profile)
+
+        start = perf_counter()
+        for _ in range(iterations):
+            encoded = str(access)
+        encode_us = (perf_counter() - start) / iterations * 1_000_000
+
+        start = perf_counter()
+        for _ in range(iterations):
+            AccessToken(encoded)
+        decode_us = (perf_counter() - start) / iterations * 1_000_000
+
+        return len(encoded), encode_us, decode_us
@@ -0,0 +1,140 @@
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.hashers import HASHER_PROFILES
+
+# Django's shipped work factors, recommendations below them need --allow-weak
+WORK_FACTOR_FLOORS = {
+    'PBKDF2_ITERATIONS': hashers.PBKDF2PasswordHasher.iterations,
+    'SCRYPT_WORK_FACTOR': hashers.ScryptPasswordHasher.work_factor,
+    'ARGON2_TIME_COST': hashers.Argon2PasswordHasher.time_cost,
+}
+
+
+class Command(BaseCommand):
+    help = "Measure password hashing time on this machine and recommend work factors for a target latency"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hasher', choices=sorted(HASHER_PROFILES), default=settings.PASSWORD_HASHER)
+        parser.add_argument('--target-ms', type=float, default=100.0,
+                            help="Target time for a single hash/verify in milliseconds")
+        parser.add_argument('--samples', type=int, default=3,
+                            help="Number of hashes per measurement, the fastest one is kept")
+        parser.add_argument('--allow-weak', action='store_true',
+                            help="Recommend work factors below Django's defaults if that is what meets the target")
+
+    def handle(self, *args, **options):
+        self.samples = max(1, options['samples'])
+        target_ms = options['target_ms']
+        if target_ms <= 0:
+            raise CommandError("--target-ms must be positive.")
+
+        calibrate = getattr(self, f"calibrate_{options['hasher']}")
+        recommended, elapsed_ms = calibrate(target_ms)
+
+        weak = [
+            f"{name}={value} (Django default {WORK_FACTOR_FLOORS[name]})"
+            for name, value in recommended.items()
+            if name in WORK_FACTOR_FLOORS and value < WORK_FACTOR_FLOORS[name]
+        ]
+        if weak and not options['allow_weak']:
+            raise CommandError(
+                f"Meeting {target_ms:.1f} ms needs work factors below Django's defaults: {', '.join(weak)}. "
+                "Raise --target-ms or pass --allow-weak to accept weaker hashes."
+            )
+        for item in weak:
+            self.stderr.write(self.style.WARNING(f"Weaker than Django's default: {item}"))
+
+        self.stdout.write(f"Measured {elapsed_ms:.1f} ms per hash (target {target_ms:.1f} ms).")
+        self.stdout.write("Recommended environment:")
+        self.stdout.write(f"PASSWORD_HASHER={options['hasher']}")
+        for name, value in recommended.items():
+            self.stdout.write(f"{name}={value}")
+
+    def measure(self, profile, params):
+        hasher = HASHER_PROFILES[profile](params)
+        salt = hasher.salt()
+        best = None
+        for _ in range(self.samples):
+            start = perf_counter()
+            hasher.encode('calibration-password', salt)
+            elapsed_ms = (perf_counter() - start) * 1000
+            best = elapsed_ms if best is None else min(best, elapsed_ms)
+        return best
+
+    def calibrate_pbkdf2(self, target_ms):
+        # PBKDF2 cost is linear in iterations: grow until the measurement is
+        # long enough to be stable, then scale to the target.
+        iterations = 10000
+        elapsed_ms = self.measure('pbkdf2', {'iterations': iterations})
+        while elapsed_ms < target_ms / 2:
+            iterations *= 2
+            elapsed_ms = self.measure('pbkdf2', {'iterations': iterations})
+
+        iterations = max(1000, int(iterations * target_ms / elapsed_ms) // 1000 * 1000)
+        elapsed_ms = self.measure('pbkdf2', {'iterations': iterations})
+        return {'PBKDF2_ITERATIONS': iterations}, elapsed_ms
+
+    def calibrate_scrypt(self, target_ms):
+        # The work factor must be a power of two, keep the largest one under the target
+        block_size = settings.PASSWORD_HASHER_PARAMS['scrypt']['block_size']
+        parallelism = settings.PASSWORD_HASHER_PARAMS['scrypt']['parallelism']
+
+        def params(work_factor):
+            return {
+                'work_factor': work_factor,
+                'block_size': block_size,
+                'parallelism': parallelism,
+                'maxmem': self.scrypt_maxmem(work_factor, block_size),
+            }
+
+        work_factor = 2 ** 10
+        elapsed_ms = self.measure('scrypt', params(work_factor))
+        while True:
+            next_ms = self.measure('scrypt', params(work_factor * 2))
+            if next_ms > target_ms:
+                break
+            work_factor, elapsed_ms = work_factor * 2, next_ms
+
+        return {
+            'SCRYPT_WORK_FACTOR': work_factor,
+            'SCRYPT_BLOCK_SIZE': block_size,
+            'SCRYPT_PARALLELISM': parallelism,
+            'SCRYPT_MAXMEM': self.scrypt_maxmem(work_factor, block_size),
+        }, elapsed_ms
+
+    @staticmethod
+    def scrypt_maxmem(work_factor, block_size):
+        # hashlib.scrypt refuses anything over 32 MiB unless maxmem is raised
+        required = 128 * work_factor * block_size
+        return 0 if required * 2 <= 32 * 1024 * 1024 else required * 2
+
+    def calibrate_argon2(self, target_ms):
+        try:
+            import argon2  # noqa: F401
+        except ImportError:
+            raise CommandError("argon2 requires the argon2-cffi package.")
+
+        # Memory cost and parallelism are kept as configured, only time cost is tuned
+        memory_cost = settings.PASSWORD_HASHER_PARAMS['argon2']['memory_cost']
+        parallelism = settings.PASSWORD_HASHER_PARAMS['argon2']['parallelism']
+
+        def params(time_cost):
+            return {'time_cost': time_cost, 'memory_cost': memory_cost, 'parallelism': parallelism}
+
+        time_cost = 1
+        elapsed_ms = self.measure('argon2', params(time_cost))
+        while True:
+            next_ms = self.measure('argon2', params(time_cost + 1))
+            if next_ms > target_ms:
+                break
+            time_cost, elapsed_ms = time_cost + 1, next_ms
+
+        return {
+            'ARGON2_TIME_COST': time_cost,
+            'ARGON2_MEMORY_COST': memory_cost,
+            'ARGON2_PARALLELISM': parallelism,
+        }, elapsed_ms
@@ -0,0 +1,57 @@
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+
+
+class HasherTimings:
+    """In-process timing counters for password hashing, keyed by algorithm and operation."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._samples = {}
+
+    @contextmanager
+    def measure(self, algorithm, operation):
+        # verify() of some hashers calls encode() internally, only time the outer call
+        if getattr(self._local, 'active', False):
+            yield
+            return
+        self._local.active = True
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (perf_counter() - start) * 1000
+            self._local.active = False
+            self.record(algorithm, operation, elapsed_ms)
+
+    def record(self, algorithm, operation, elapsed_ms):
+        with self._lock:
+            stats = self._samples.setdefault(algorithm, {}).setdefault(
+                operation, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+            )
+            stats['count'] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                algorithm: {
+                    operation: {
+                        'count': stats['count'],
+                        'avg_ms': round(stats['total_ms'] / stats['count'], 3),
+                        'max_ms': round(stats['max_ms'], 3),
+                    }
+                    for operation, stats in operations.items()
+                }
+                for algorithm, operations in self._samples.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+
+hasher_timings = HasherTimings()
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.utils.encoding import force_bytes, force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from .db_router import restore_user_pin
+
+User = get_user_model()
+
+
+def _email_key(email):
+    return f"auth:reset:email:{email.lower()}"
+
+
+def issue_reset_token(user):
+    """
+    Return (uid, token, created) for a password reset of user.
+
+    Within PASSWORD_RESET_COOLDOWN of the last issued token for the same email the
+    outstanding token is returned with created=False, so the caller doesn't send
+    another email. cache.add() makes concurrent retries agree on a single token.
+    """
+    uid = urlsafe_base64_encode(force_bytes(user.pk))
+    token = default_token_generator.make_token(user)
+    record = {'uid': uid, 'token': token}
+    email_key = _email_key(user.email)
+
+    if not cache.add(email_key, record, settings.PASSWORD_RESET_COOLDOWN):
+        outstanding = cache.get(email_key)
+        if outstanding and default_token_generator.check_token(user, outstanding['token']):
+            return outstanding['uid'], outstanding['token'], False
+        # The outstanding token was invalidated (e.g. password changed meanwhile)
+        cache.set(email_key, record, settings.PASSWORD_RESET_COOLDOWN)
+
+    return uid, token, True
+
+
+def resolve_reset_user(uid):
+    """
+    User a reset link points to. The uid decodes to the primary key, so this is a
+    single pk lookup and needs no cache entry. Raises the same errors as the decode/get.
+    """
+    pk = force_str(urlsafe_base64_decode(uid))
+    # The token depends on the password hash, which a replica may not have caught up with
+    restore_user_pin(pk)
+    return User.objects.get(pk=pk)
+
+
+def release_reset_token(user):
+    """Free the cooldown slot of a token whose email could not be sent, so a retry sends again"""
+    cache.delete(_email_key(user.email))
+
+
+def consume_reset_token(user):
+    """Free the cooldown slot once the password was reset"""
+    cache.delete(_email_key(user.email))
@@ -6,9 +6,14 @@ from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.conf import settings
 from django.core.mail import send_mail
-from django.utils.http import urlsafe_base64_encode
-from django.utils.encoding import force_bytes
-from django.contrib.auth.tokens import default_token_generator
+from .claims import add_token_claims, user_roles
+from .reset_tokens import issue_reset_token, release_reset_token
+from .social import refresh_keys_for
+from .db_router import restore_email_pin
+from allauth.socialaccount.adapter import get_adapter as get_socialaccount_adapter
+from allauth.socialaccount.models import SocialApp
+from django.core.exceptions import ValidationError as DjangoValidationError
+import jwt
 
 # This method will return the currently active user model
 User = get_user_model()
@@ -53,14 +58,13 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
-        # Add custom claims if needed Add profiles [Student, Prof, It, Vistor]
-        token['email'] = user.email
-        token['first_name'] = user.first_name
-        token['last_name'] = user.last_name
-        token['full_name'] = user.first_name + user.last_name
-        # Add user's role based on their group
-        token['role'] = [group.name for group in user.groups.all()] if user.groups.exists() else ['No Role']
-        return token
+        # Add user's claims and roles based on their groups, see JWT_CLAIMS_PROFILE
+        return add_token_claims(token, user, user_roles(user))
+
+    def validate(self, attrs):
+        # Read a user who just changed their password from the primary
+        restore_email_pin(attrs.get(self.username_field))
+        return super().validate(attrs)
 
 
 class LoginSerializer(serializers.Serializer):
@@ -72,6 +76,9 @@ class LoginSerializer(serializers.Serializer):
         password = data.get('password')
 
         if email and password:
+            restore_email_pin(email)
+            # check_password() inside the auth backend re-hashes the password with the
+            # preferred hasher when PASSWORD_HASHER or its work factors changed
             user = authenticate(request=self.context.get('request'), email=email, password=password)
             if not user:
                 raise serializers.ValidationError("Invalid email or password.")
@@ -89,38 +96,93 @@ class LoginSerializer(serializers.Serializer):
         }
 
 
+class GoogleLoginSerializer(serializers.Serializer):
+    """Sign in with a Google ID token (e.g. from Google Identity Services) and get our JWTs"""
+    id_token = serializers.CharField(write_only=True)
+
+    def validate(self, data):
+        request = self.context.get('request')
+        credential = data['id_token']
+        try:
+            provider = get_socialaccount_adapter().get_provider(request, 'google')
+        except SocialApp.DoesNotExist:
+            raise serializers.ValidationError("Google login is not configured.")
+
+        # allauth expects a kid header and fails with a KeyError without one
+        try:
+            kid = jwt.get_unverified_header(credential).get('kid')
+        except jwt.PyJWTError:
+            kid = None
+        if not kid:
+            raise serializers.ValidationError("Invalid Google token.")
+
+        refresh_keys_for(kid)
+        try:
+            login = provider.verify_token(request, {'id_token': credential})
+        except DjangoValidationError:
+            raise serializers.ValidationError("Invalid Google token.")
+
+        login.lookup()
+        if login.is_existing:
+            # Signing into a local account by email only happens with SOCIALACCOUNT_EMAIL_AUTHENTICATION,
+            # allauth then wipes its password unless the email is verified and links it with _AUTO_CONNECT
+            login._accept_login(request)
+        elif User.objects.filter(email=login.user.email).exists():
+            raise serializers.ValidationError("This email is already in use.")
+        else:
+            login.save(request)
+            visitor_group = Group.objects.filter(name='visitor').first()
+            if visitor_group:
+                login.user.groups.add(visitor_group)
+
+        data['user'] = login.user
+        return data
+
+    def get_tokens(self, user):
+        refresh = CustomTokenObtainPairSerializer.get_token(user)
+        return {
+            'refresh': str(refresh),
+            'access': str(refresh.access_token),
+        }
+
+
 class PasswordResetSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
     def validate_email(self, value):
-        if not User.objects.filter(email=value).exists():
+        self.user = User.objects.filter(email=value).first()
+        if self.user is None:
             raise serializers.ValidationError("No user with this email exists.")
         return value
 
     def save(self):
         email = self.validated_data['email']
-        user = User.objects.get(email=email)
 
-        # Generate token and uid
-        token = default_token_generator.make_token(user)
-        uid = urlsafe_base64_encode(force_bytes(user.pk))
+        # Reuse the outstanding token if one was sent moments ago, see reset_tokens
+        uid, token, created = issue_reset_token(self.user)
+        if not created:
+            return
 
         # Construct reset URL 
         reset_url = f"{settings.FRONTEND_URL}/auth/reset-password/{uid}/{token}/"
 
-        # Send email
-        send_mail(
-            subject='Password Reset Request',
-            message=f'Click this link to reset your password: {reset_url}',
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[email],
-            fail_silently=False,
-        )
+        # Send email, on failure free the cooldown slot so a retry sends again
+        try:
+            send_mail(
+                subject='Password Reset Request',
+                message=f'Click this link to reset your password: {reset_url}',
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipient_list=[email],
+                fail_silently=False,
+            )
+        except Exception:
+            release_reset_token(self.user)
+            raise
 
 
 class PasswordResetConfirmSerializer(serializers.Serializer):
-    uid = serializers.CharField()
-    token = serializers.CharField()
+    uid = serializers.CharField(max_length=64)
+    token = serializers.CharField(max_length=128)
     new_password = serializers.CharField(min_length=8, write_only=True)
 
     def validate_new_password(self, value):
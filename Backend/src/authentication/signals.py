@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+
+from .claims import invalidate_display_claims, invalidate_display_claims_for
+from .db_router import pin_users_to_primary
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def invalidate_display_claims_on_save(sender, instance, created, **kwargs):
+    """Any save may change the names/email in /me/claims (profile, admin, social login)"""
+    if not created:
+        invalidate_display_claims(instance)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_display_claims_on_group_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Cached /me/claims carry the role list, drop them when group membership changes"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_display_claims(instance)
+    elif action in ('post_add', 'post_remove'):
+        invalidate_display_claims_for(pk_set)
+    elif action == 'pre_clear':
+        # pk_set is None when clearing a group, look the members up before they are removed
+        invalidate_display_claims_for(instance.user_set.values_list('pk', flat=True))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def pin_group_members_to_primary(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Writes from the group side (group.user_set.add()) carry no user instance for the
+    router to pin, pin the affected users here so they read their new roles.
+    """
+    if not reverse:
+        return
+    if action in ('post_add', 'post_remove'):
+        pin_users_to_primary(pk_set)
+    elif action == 'pre_clear':
+        pin_users_to_primary(list(instance.user_set.values_list('pk', flat=True)))
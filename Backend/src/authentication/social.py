@@ -0,0 +1,94 @@
+import json
+import threading
+from http.cookiejar import DefaultCookiePolicy
+
+import jwt
+import requests
+from allauth.socialaccount import app_settings as socialaccount_settings
+from allauth.socialaccount.adapter import DefaultSocialAccountAdapter
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def metadata_urls():
+    """Provider URLs whose responses are cached, the Google provider only fetches its certs"""
+    from allauth.socialaccount.providers.google import views as google_views
+    return {google_views.CERTS_URL}
+
+
+def _metadata_key(url):
+    return f"auth:social-metadata:{url}"
+
+
+class ProviderSession(requests.Session):
+    """
+    requests session for OAuth provider calls. GETs of metadata_urls() (the signing
+    certs) are answered from the cache for SOCIAL_METADATA_CACHE_TIMEOUT, everything
+    else goes over the pooled connections.
+    """
+
+    def request(self, method, url, *args, **kwargs):
+        kwargs.setdefault('timeout', socialaccount_settings.REQUESTS_TIMEOUT)
+        if method.upper() != 'GET' or url not in metadata_urls():
+            return super().request(method, url, *args, **kwargs)
+
+        cached = cache.get(_metadata_key(url))
+        if cached is None:
+            response = super().request(method, url, *args, **kwargs)
+            if not response.ok:
+                return response
+            cached = response.content
+            cache.set(_metadata_key(url), cached, settings.SOCIAL_METADATA_CACHE_TIMEOUT)
+
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.encoding = 'utf-8'
+        response.headers['Content-Type'] = 'application/json'
+        response._content = cached
+        return response
+
+
+def get_provider_session():
+    """
+    Process-wide session so provider calls reuse their TLS connections. It is shared
+    by every user's login, so it refuses to store cookies.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = ProviderSession()
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings.SOCIAL_HTTP_POOL_SIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def refresh_keys_for(kid):
+    """
+    Drop the cached Google certs when they don't contain kid, the key a token is
+    signed with (key rotation). Bogus kids can force a refetch at most once a minute.
+    """
+    from allauth.socialaccount.providers.google import views as google_views
+
+    cached = cache.get(_metadata_key(google_views.CERTS_URL))
+    if cached is None:
+        return
+    try:
+        keys = json.loads(cached)
+    except ValueError:
+        return
+    if kid not in keys and cache.add(f"{_metadata_key(google_views.CERTS_URL)}:refreshed", True, 60):
+        cache.delete(_metadata_key(google_views.CERTS_URL))
+
+
+class SocialAccountAdapter(DefaultSocialAccountAdapter):
+    def get_requests_session(self):
+        return get_provider_session()
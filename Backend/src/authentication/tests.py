@@ -1,7 +1,37 @@
-from django.test import TestCase
-from rest_framework.test import APITestCase
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connections
+from django.conf import settings
+from unittest import skipUnless
+from rest_framework.test import APITestCase, APITransactionTestCase
 from django.urls import reverse
 from rest_framework import status
+from django.contrib.auth import get_user_model
+from django.core.management import call_command, CommandError
+from io import StringIO
+from django.core import mail
+from django.core.cache import cache
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import datetime
+import json
+import threading
+import time
+import jwt
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from .metrics import hasher_timings
+from rest_framework_simplejwt.tokens import AccessToken
+from django.contrib.auth.models import Group
+from .serializers import LoginSerializer, CustomTokenObtainPairSerializer
+from .db_router import AuthReplicaRouter, PrimaryPinMiddleware, restore_user_pin
+from .signals import pin_group_members_to_primary
+from .social import get_provider_session
+from allauth.socialaccount.models import SocialAccount
+
+User = get_user_model()
 
 class AuthTests(APITestCase):
     def test_register_user(self):
@@ -25,4 +55,317 @@ class AuthTests(APITestCase):
         self.client.post(reverse('register'), {'email': 'resetuser@example.com', 'username': 'resetuser', 'password': 'resetpass789'}, format='json')
         response = self.client.post(url, {'email': 'resetuser@example.com'}, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIn('message', response.data)
\ No newline at end of file
+        self.assertIn('message', response.data)
+
+
+@override_settings(
+    PASSWORD_HASHERS=['authentication.hashers.PBKDF2PasswordHasher'],
+    PASSWORD_HASHER_PARAMS={'pbkdf2': {'iterations': 1000}},
+)
+class PasswordHasherTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='hash@example.com', password='Hashpass123')
+        hasher_timings.reset()
+
+    def test_login_upgrades_hash_when_work_factor_changes(self):
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+        with self.settings(PASSWORD_HASHER_PARAMS={'pbkdf2': {'iterations': 2000}}):
+            serializer = LoginSerializer(data={'email': 'hash@example.com', 'password': 'Hashpass123'})
+            self.assertTrue(serializer.is_valid())
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+
+    def test_verify_timing_is_recorded(self):
+        self.user.check_password('Hashpass123')
+        timings = hasher_timings.snapshot()
+        self.assertEqual(timings['pbkdf2_sha256']['verify']['count'], 1)
+        self.assertNotIn('encode', timings['pbkdf2_sha256'])
+
+    def test_calibrate_hasher_refuses_weak_work_factors(self):
+        with self.assertRaisesMessage(CommandError, '--allow-weak'):
+            call_command('calibrate_hasher', hasher='pbkdf2', target_ms=5, samples=1, stdout=StringIO())
+
+        out, err = StringIO(), StringIO()
+        call_command('calibrate_hasher', hasher='pbkdf2', target_ms=5, samples=1, allow_weak=True,
+                     stdout=out, stderr=err)
+        self.assertIn('PBKDF2_ITERATIONS=', out.getvalue())
+        self.assertIn("Weaker than Django's default", err.getvalue())
+
+
+class ClaimsProfileTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='claims@example.com', password='Claimspass123',
+                                             first_name='Claims', last_name='User')
+        cache.clear()
+        self.user.groups.add(Group.objects.create(name='student'))
+
+    @override_settings(JWT_CLAIMS_PROFILE='full')
+    def test_full_profile_keeps_display_claims(self):
+        token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        self.assertEqual(token['email'], 'claims@example.com')
+        self.assertEqual(token['role'], ['student'])
+
+    @override_settings(JWT_CLAIMS_PROFILE='minimal')
+    def test_minimal_profile_uses_role_codes(self):
+        token = AccessToken(str(CustomTokenObtainPairSerializer.get_token(self.user).access_token))
+        self.assertEqual(token['rl'], [2])
+        self.assertNotIn('email', token.payload)
+
+    def test_me_claims_is_refreshed_after_profile_update(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('me_claims'))
+        self.assertEqual(response.data['first_name'], 'Claims')
+        self.client.put(reverse('user_profile'), {'first_name': 'Renamed'}, format='json')
+        response = self.client.get(reverse('me_claims'))
+        self.assertEqual(response.data['first_name'], 'Renamed')
+
+    def test_me_claims_is_refreshed_after_any_user_save(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(reverse('me_claims')).data['last_name'], 'User')
+        self.user.last_name = 'Saved'
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('me_claims')).data['last_name'], 'Saved')
+
+    @override_settings(JWT_CLAIMS_PROFILE='minimal')
+    def test_minimal_profile_drops_unregistered_roles(self):
+        self.user.groups.add(Group.objects.create(name='unregistered'))
+        with self.assertLogs('authentication.claims', level='WARNING'):
+            token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        self.assertEqual(token['rl'], [2])
+
+    def test_me_claims_is_refreshed_after_group_change(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(reverse('me_claims')).data['role'], ['student'])
+        Group.objects.create(name='it').user_set.add(self.user)
+        self.assertEqual(sorted(self.client.get(reverse('me_claims')).data['role']), ['it', 'student'])
+        self.user.groups.clear()
+        self.assertEqual(self.client.get(reverse('me_claims')).data['role'], ['No Role'])
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class PasswordResetStoreTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='store@example.com', password='Storepass123')
+
+    def test_repeated_requests_send_one_email(self):
+        for _ in range(3):
+            response = self.client.post(reverse('password_reset'), {'email': 'store@example.com'}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_confirm_with_issued_token(self):
+        self.client.post(reverse('password_reset'), {'email': 'store@example.com'}, format='json')
+        uid, token = mail.outbox[0].body.rstrip('/').split('/')[-2:]
+        data = {'uid': uid, 'token': token, 'new_password': 'Newpass1234'}
+        response = self.client.post(reverse('password_reset_confirm'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('Newpass1234'))
+
+        # The used token is rejected and a new request sends a new email
+        response = self.client.post(reverse('password_reset_confirm'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.post(reverse('password_reset'), {'email': 'store@example.com'}, format='json')
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_confirm_rejects_oversized_token(self):
+        data = {'uid': 'MQ', 'token': 'x' * 500, 'new_password': 'Newpass1234'}
+        response = self.client.post(reverse('password_reset_confirm'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('token', response.data)
+
+    def test_failed_email_does_not_hold_the_cooldown(self):
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError):
+            with self.assertRaises(OSError):
+                self.client.post(reverse('password_reset'), {'email': 'store@example.com'}, format='json')
+        response = self.client.post(reverse('password_reset'), {'email': 'store@example.com'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(mail.outbox), 1)
+
+
+@override_settings(
+    AUTH_DB_REPLICAS=['replica_1'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class AuthReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = AuthReplicaRouter()
+
+    def request(self, handler):
+        # Every request starts unpinned, like in PrimaryPinMiddleware
+        return PrimaryPinMiddleware(handler)(None)
+
+    def test_reads_go_to_replica_and_writes_to_default(self):
+        def handler(request):
+            return self.router.db_for_read(User), self.router.db_for_read(Group), self.router.db_for_write(Group)
+        self.assertEqual(self.request(handler), ('replica_1', 'replica_1', 'default'))
+
+    def test_other_apps_are_not_routed(self):
+        from django.contrib.sessions.models import Session
+        self.assertIsNone(self.router.db_for_read(Session))
+
+    def test_user_write_pins_reads_to_default(self):
+        def write(request):
+            self.router.db_for_write(User, instance=User(pk=42, email='pinned@example.com'))
+            return self.router.db_for_read(User)
+        self.assertEqual(self.request(write), 'default')
+
+        # Later requests of the same user read from the primary once authenticated
+        def read_as(user_id):
+            def handler(request):
+                before = self.router.db_for_read(User)
+                restore_user_pin(user_id)
+                return before, self.router.db_for_read(User)
+            return handler
+        self.assertEqual(self.request(read_as(42)), ('replica_1', 'default'))
+        self.assertEqual(self.request(read_as(43)), ('replica_1', 'replica_1'))
+
+    def test_group_side_membership_change_pins_members(self):
+        # group.user_set.add() reaches the router without a user instance
+        self.request(lambda request: pin_group_members_to_primary(
+            sender=User.groups.through, instance=None, action='post_add', reverse=True, pk_set={7}
+        ))
+
+        def handler(request):
+            restore_user_pin(7)
+            return self.router.db_for_read(Group)
+        self.assertEqual(self.request(handler), 'default')
+
+
+@skipUnless('replica_1' in settings.DATABASES, "set DB_REPLICAS to run the read replica tests")
+@override_settings(
+    PASSWORD_HASHERS=['authentication.hashers.PBKDF2PasswordHasher'],
+    PASSWORD_HASHER_PARAMS={'pbkdf2': {'iterations': 1000}},
+    AUTH_DB_REPLICAS=['replica_1'],
+)
+class ReadReplicaTests(APITransactionTestCase):
+    # Not TestCase: reads inside a transaction on default always stay on default
+    databases = {'default', *settings.AUTH_DB_REPLICAS}
+
+    def setUp(self):
+        cache.clear()
+        # A replica lagging behind: same user, older first name
+        for alias, first_name in (('default', 'Primary'), ('replica_1', 'Replica')):
+            User.objects.db_manager(alias).create_user(
+                id=1, email='replica@example.com', password='Replicapass123', first_name=first_name
+            )
+        response = self.client.post(reverse('login'), {'email': 'replica@example.com', 'password': 'Replicapass123'},
+                                    format='json')
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def test_reads_hit_replica_until_own_write(self):
+        with CaptureQueriesContext(connections['replica_1']) as replica_queries:
+            response = self.client.get(reverse('user_profile'))
+        self.assertEqual(response.data['first_name'], 'Replica')
+        self.assertTrue(replica_queries.captured_queries)
+
+        self.client.put(reverse('user_profile'), {'first_name': 'Updated'}, format='json')
+        with CaptureQueriesContext(connections['replica_1']) as replica_queries:
+            response = self.client.get(reverse('user_profile'))
+        self.assertEqual(response.data['first_name'], 'Updated')
+        self.assertFalse(replica_queries.captured_queries)
+
+    def test_login_after_password_change_reads_primary(self):
+        response = self.client.post(reverse('change_password'),
+                                    {'old_password': 'Replicapass123', 'new_password': 'Changedpass456'},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.credentials()
+        response = self.client.post(reverse('login'), {'email': 'replica@example.com', 'password': 'Changedpass456'},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class StubGoogleCerts(BaseHTTPRequestHandler):
+    """Serves the Google certs endpoint and counts how often it is hit"""
+    certs = {}
+    hits = 0
+
+    def do_GET(self):
+        StubGoogleCerts.hits += 1
+        body = json.dumps(self.certs).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Set-Cookie', 'NID=stub; Path=/')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(SOCIALACCOUNT_PROVIDERS={'google': {'APP': {'client_id': 'test-client', 'secret': 'secret', 'key': ''}}})
+class GoogleLoginTests(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'stub')])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        certificate = (
+            x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(cls.key.public_key())
+            .serial_number(1).not_valid_before(now).not_valid_after(now + datetime.timedelta(days=1))
+            .sign(cls.key, hashes.SHA256())
+        )
+        StubGoogleCerts.certs = {'stub-kid': certificate.public_bytes(serialization.Encoding.PEM).decode()}
+        cls.server = HTTPServer(('127.0.0.1', 0), StubGoogleCerts)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.certs_url = f"http://127.0.0.1:{cls.server.server_port}/oauth2/v1/certs"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        StubGoogleCerts.hits = 0
+        patcher = mock.patch('allauth.socialaccount.providers.google.views.CERTS_URL', self.certs_url)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def id_token(self, email='google@example.com', kid='stub-kid'):
+        claims = {
+            'iss': 'https://accounts.google.com', 'aud': 'test-client', 'sub': '1234567890',
+            'email': email, 'email_verified': True, 'given_name': 'Google', 'family_name': 'User',
+            'exp': int(time.time()) + 300,
+        }
+        return jwt.encode(claims, self.key, algorithm='RS256', headers={'kid': kid})
+
+    def test_google_login_issues_jwt_and_caches_certs(self):
+        for _ in range(2):
+            response = self.client.post(reverse('google_login'), {'id_token': self.id_token()}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn('access', response.data)
+        self.assertEqual(User.objects.filter(email='google@example.com').count(), 1)
+        self.assertEqual(StubGoogleCerts.hits, 1)
+
+    def test_google_login_does_not_take_over_existing_account(self):
+        User.objects.create_user(email='google@example.com', password='Googlepass123')
+        response = self.client.post(reverse('google_login'), {'id_token': self.id_token()}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn('access', response.data)
+        self.assertFalse(SocialAccount.objects.exists())
+
+    def test_provider_session_keeps_no_cookies(self):
+        self.client.post(reverse('google_login'), {'id_token': self.id_token()}, format='json')
+        self.assertEqual(StubGoogleCerts.hits, 1)
+        self.assertEqual(len(get_provider_session().cookies), 0)
+
+    def test_token_without_kid_is_rejected(self):
+        credential = jwt.encode({'iss': 'https://accounts.google.com', 'aud': 'test-client', 'sub': '1'},
+                                self.key, algorithm='RS256')
+        response = self.client.post(reverse('google_login'), {'id_token': credential}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(StubGoogleCerts.hits, 0)
+
+    def test_unknown_kid_refetches_certs(self):
+        self.client.post(reverse('google_login'), {'id_token': self.id_token()}, format='json')
+        response = self.client.post(reverse('google_login'), {'id_token': self.id_token(kid='rotated')}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(StubGoogleCerts.hits, 2)
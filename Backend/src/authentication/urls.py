@@ -1,15 +1,19 @@
 from django.urls import path
-from .views import RegisterView, CustomTokenObtainPairView, TokenRefreshView, LogoutView, PasswordResetConfirmView, PasswordResetView, UserProfileView, ChangePasswordView, DeleteAccountView
+from .views import RegisterView, CustomTokenObtainPairView, TokenRefreshView, LogoutView, PasswordResetConfirmView, PasswordResetView, UserProfileView, ChangePasswordView, DeleteAccountView, HasherMetricsView, MeClaimsView, GoogleLoginView
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', CustomTokenObtainPairView.as_view(), name='login'),
-    path('logout/', LogoutView.as_view(), name='login'),
+    path('logout/', LogoutView.as_view(), name='logout'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('social/google/', GoogleLoginView.as_view(), name='google_login'),
     path('password/reset/', PasswordResetView.as_view(), name='password_reset'),
     path('password/reset/confirm/', PasswordResetConfirmView.as_view(), name='password_reset_confirm'),
 
     path('profile/', UserProfileView.as_view(), name='user_profile'),
+    path('me/claims/', MeClaimsView.as_view(), name='me_claims'),
     path('change-password/', ChangePasswordView.as_view(), name='change_password'),
-    path('delete-account/', DeleteAccountView.as_view(), name='delete_account')
+    path('delete-account/', DeleteAccountView.as_view(), name='delete_account'),
+
+    path('metrics/hashers/', HasherMetricsView.as_view(), name='hasher_metrics'),
 ]
@@ -2,16 +2,18 @@ from django.shortcuts import render
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from .serializers import UserSerializer, CustomTokenObtainPairSerializer, LoginSerializer,PasswordResetConfirmSerializer, PasswordResetSerializer, UserProfileSerializer, ChangePasswordSerializer
+from .serializers import UserSerializer, CustomTokenObtainPairSerializer, LoginSerializer,PasswordResetConfirmSerializer, PasswordResetSerializer, UserProfileSerializer, ChangePasswordSerializer, GoogleLoginSerializer
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
-from django.utils.http import urlsafe_base64_decode
-from django.utils.encoding import force_str
 from rest_framework_simplejwt.exceptions import TokenError
 from django.contrib.auth.tokens import default_token_generator
 from rest_framework.permissions import AllowAny
+from .metrics import hasher_timings
+from .permissions import IsSuperUser
+from .claims import get_display_claims
+from .reset_tokens import resolve_reset_user, consume_reset_token
 
 User = get_user_model()
 
@@ -41,6 +43,20 @@ class LoginView(APIView):
             'refresh': tokens['refresh'],
         }, status=status.HTTP_200_OK)
 
+class GoogleLoginView(APIView):
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        """Exchange a Google ID token for our access/refresh tokens, no session involved"""
+        serializer = GoogleLoginSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        tokens = serializer.get_tokens(serializer.validated_data['user'])
+        return Response({
+            'message': 'Login successful',
+            'access': tokens['access'],
+            'refresh': tokens['refresh'],
+        }, status=status.HTTP_200_OK)
+
 class PasswordResetView(APIView):
     permission_classes = [AllowAny]
 
@@ -65,8 +81,7 @@ class PasswordResetConfirmView(APIView):
             new_password = serializer.validated_data['new_password']
             
             try:
-                uid = force_str(urlsafe_base64_decode(uid))
-                user = User.objects.get(pk=uid)
+                user = resolve_reset_user(uid)
             except (TypeError, ValueError, OverflowError, User.DoesNotExist):
                 return Response(
                     {"error": "Invalid reset link"},
@@ -76,6 +91,7 @@ class PasswordResetConfirmView(APIView):
             if default_token_generator.check_token(user, token):
                 user.set_password(new_password)
                 user.save()
+                consume_reset_token(user)
                 return Response(
                     {"message": "Password has been reset successfully"},
                     status=status.HTTP_200_OK
@@ -122,6 +138,14 @@ class UserProfileView(APIView):
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+
+class MeClaimsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Display claims of the current user (not carried by minimal tokens)"""
+        return Response(get_display_claims(request.user), status=status.HTTP_200_OK)
+
 class ChangePasswordView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -155,4 +179,12 @@ class DeleteAccountView(APIView):
             return Response(
                 {"error": str(e)},
                 status=status.HTTP_400_BAD_REQUEST
-            )
\ No newline at end of file
+            )
+
+
+class HasherMetricsView(APIView):
+    permission_classes = [IsSuperUser]
+
+    def get(self, request):
+        """Password hashing timings per hasher since process start"""
+        return Response(hasher_timings.snapshot(), status=status.HTTP_200_OK)
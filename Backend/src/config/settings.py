@@ -55,7 +55,7 @@ INSTALLED_APPS = [
 SITE_ID = 1  # Required for django.contrib.sites
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.jwt_auth.StickyJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -105,6 +105,23 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSlidingSerializer",
 }
 
+# Claims added to tokens by CustomTokenObtainPairSerializer:
+# "full" carries email, names and role names, "minimal" only carries role codes (`rl`)
+# and clients read display fields from /api/auth/me/claims/
+# Compare both with `python manage.py benchmark_claims`
+JWT_CLAIMS_PROFILE = os.getenv('JWT_CLAIMS_PROFILE', 'full')
+
+# Numeric role codes used by the minimal profile, keep codes stable once issued
+JWT_ROLE_CODES = {
+    'No Role': 0,
+    'visitor': 1,
+    'student': 2,
+    'professor': 3,
+    'it': 4,
+}
+
+ME_CLAIMS_CACHE_TIMEOUT = 300  # seconds
+
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
@@ -118,6 +135,7 @@ MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'allauth.account.middleware.AccountMiddleware',
+    'authentication.db_router.PrimaryPinMiddleware',
 
 ]
 
@@ -153,6 +171,43 @@ DATABASES = {
     }
 }
 
+# Read replicas of the default database, e.g. DB_REPLICAS=db_replica.sqlite3 locally
+# (copy db.sqlite3 to it) or a comma separated list of Postgres database names.
+# Reads of the authentication app go to a random replica, see AuthReplicaRouter.
+# Tests get a separate replica_N test database, so run them with DB_REPLICAS (and
+# REDIS_URL) set to also cover the replica routing.
+AUTH_DB_REPLICAS = []
+for _index, _name in enumerate(filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1):
+    _engine = DATABASES['default']['ENGINE']
+    DATABASES[f'replica_{_index}'] = {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / _name.strip() if _engine.endswith('sqlite3') else _name.strip(),
+    }
+    AUTH_DB_REPLICAS.append(f'replica_{_index}')
+
+DATABASE_ROUTERS = ['authentication.db_router.AuthReplicaRouter']
+
+# The cache holds the read-your-writes pins, password reset cooldowns and /me/claims.
+# With several workers it must be shared, so set REDIS_URL; the per-process
+# LocMemCache is only fine for a single process. Replicas refuse to start without a
+# shared cache (check authentication.E001).
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# How long a user keeps reading from the primary after their own write
+AUTH_DB_STICKY_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -173,6 +228,46 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# PASSWORD_HASHER picks the hasher new hashes are written with (pbkdf2, scrypt or argon2).
+# Existing hashes are upgraded on the next successful login when the hasher or its
+# work factors change. Run `python manage.py calibrate_hasher --target-ms 100` on the
+# target hardware to get recommended values; values below Django's defaults are only
+# printed with --allow-weak. argon2 needs the argon2-cffi package.
+
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'pbkdf2')
+
+PASSWORD_HASHER_PARAMS = {
+    'pbkdf2': {
+        'iterations': int(os.getenv('PBKDF2_ITERATIONS', 870000)),
+    },
+    'scrypt': {
+        'work_factor': int(os.getenv('SCRYPT_WORK_FACTOR', 2 ** 14)),
+        'block_size': int(os.getenv('SCRYPT_BLOCK_SIZE', 8)),
+        'parallelism': int(os.getenv('SCRYPT_PARALLELISM', 5)),
+        'maxmem': int(os.getenv('SCRYPT_MAXMEM', 0)),
+    },
+    'argon2': {
+        'time_cost': int(os.getenv('ARGON2_TIME_COST', 2)),
+        'memory_cost': int(os.getenv('ARGON2_MEMORY_COST', 102400)),
+        'parallelism': int(os.getenv('ARGON2_PARALLELISM', 8)),
+    },
+}
+
+_PASSWORD_HASHER_CLASSES = {
+    'pbkdf2': 'authentication.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'authentication.hashers.ScryptPasswordHasher',
+    'argon2': 'authentication.hashers.Argon2PasswordHasher',
+}
+
+# The first entry is the preferred hasher, the rest are only used to verify old hashes
+PASSWORD_HASHERS = [_PASSWORD_HASHER_CLASSES[PASSWORD_HASHER]] + [
+    path for name, path in _PASSWORD_HASHER_CLASSES.items() if name != PASSWORD_HASHER
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
@@ -206,6 +301,10 @@ EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 
+# Repeated reset requests for the same email within this window reuse the
+# outstanding token and don't send another email
+PASSWORD_RESET_COOLDOWN = 60 * 5  # seconds
+
 
 
 # # Frontend URL (adjust this to match your frontend)
@@ -216,7 +315,7 @@ CORS_ALLOW_ALL_ORIGINS = True
 
 # GOOGLE Authentication
 
-SOCIAL_ACCOUNT_PROVIDERS = {
+SOCIALACCOUNT_PROVIDERS = {
     "google": {
         "SCOPE": [
             "profile",
@@ -226,12 +325,36 @@ SOCIAL_ACCOUNT_PROVIDERS = {
     }
 }
 
+if os.getenv('GOOGLE_CLIENT_ID'):
+    SOCIALACCOUNT_PROVIDERS["google"]["APP"] = {
+        "client_id": os.getenv('GOOGLE_CLIENT_ID'),
+        "secret": os.getenv('GOOGLE_CLIENT_SECRET', ''),
+        "key": "",
+    }
+
+# Point the Google provider at a local stub OAuth server, e.g. GOOGLE_OAUTH_URL=http://localhost:9000
+GOOGLE_OAUTH_URL = os.getenv('GOOGLE_OAUTH_URL')
+if GOOGLE_OAUTH_URL:
+    SOCIALACCOUNT_PROVIDERS["google"].update({
+        "AUTHORIZE_URL": f"{GOOGLE_OAUTH_URL}/o/oauth2/v2/auth",
+        "ACCESS_TOKEN_URL": f"{GOOGLE_OAUTH_URL}/token",
+        "IDENTITY_URL": f"{GOOGLE_OAUTH_URL}/oauth2/v2/userinfo",
+        "CERTS_URL": f"{GOOGLE_OAUTH_URL}/oauth2/v1/certs",
+        "ID_TOKEN_ISSUER": GOOGLE_OAUTH_URL,
+    })
+
+# Provider calls share one pooled session, the Google signing certs are cached
+SOCIALACCOUNT_ADAPTER = 'authentication.social.SocialAccountAdapter'
+SOCIAL_HTTP_POOL_SIZE = 10
+SOCIAL_METADATA_CACHE_TIMEOUT = 60 * 60  # seconds
+
 AUTHENTICATION_BACKENDS = [
     "django.contrib.auth.backends.ModelBackend",
     'allauth.account.auth_backends.AuthenticationBackend',
 ]
 
-SOCIALACCOUNT_STORE_TOKENS = True
+# Google tokens aren't used anywhere, clients get our own JWTs from /api/auth/social/google/
+SOCIALACCOUNT_STORE_TOKENS = False
 
 LOGIN_REDIRCT_URL = FRONTEND_URL
 SOCIALACCOUNT_LOGIN_REDIRECT_URL = FRONTEND_URL
@@ -239,5 +362,8 @@ SOCIALACCOUNT_LOGIN_REDIRECT_URL = FRONTEND_URL
 SOCIALACCOUNT_LOGIN_ON_GET = True
 SOCIALACCOUNT_AUTO_SIGNUP = True  # Enable auto-signup for social accounts
 SOCIALACCOUNT_EMAIL_REQUIRED = True  # Require email for social accounts
+# Google sign-in never logs into or links an existing local account with the same email
+SOCIALACCOUNT_EMAIL_AUTHENTICATION = False
+SOCIALACCOUNT_EMAIL_AUTHENTICATION_AUTO_CONNECT = False
 
 # LOGOUT_REDIRCT_URL = "/"
\ No newline at end of file